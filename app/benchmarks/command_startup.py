@@ -0,0 +1,73 @@
+"""Benchmark of management commands startup time.
+
+Measures time from the interpreter start until the command is ready to run
+(Django setup, command import and system checks). The baseline is how the
+commands used to start: full settings with system checks. It is compared
+with slim settings, where commands skip the checks. Each measurement runs
+in a fresh interpreter.
+
+Usage (from the `app` directory):
+    python benchmarks/command_startup.py [command] [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# Settings module and whether system checks are always run.
+PROFILES = [
+    ("strouerapi.settings", True),
+    ("strouerapi.settings_commands", False),
+]
+
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import django
+from django.core.management import get_commands, load_command_class
+django.setup()
+command = load_command_class(get_commands()[{command!r}], {command!r})
+if {run_checks!r} or command.requires_system_checks:
+    command.check()
+print(time.perf_counter() - start)
+"""
+
+
+def measure(
+        command: str, settings_module: str, run_checks: bool, runs: int
+    ) -> list[float]:
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module}
+    env.setdefault("DJANGO_ALLOWED_HOSTS", "localhost")
+    script = STARTUP_SCRIPT.format(command=command, run_checks=run_checks)
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", nargs="?", default="periodical_sync")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    for settings_module, run_checks in PROFILES:
+        timings = measure(args.command, settings_module, run_checks, args.runs)
+        checks = "with checks" if run_checks else "without checks"
+        print(
+            f"{args.command} with {settings_module} ({checks}): "
+            f"median {statistics.median(timings) * 1000:.0f} ms, "
+            f"min {min(timings) * 1000:.0f} ms ({args.runs} runs)"
+        )
+
+
+if __name__ == "__main__":
+    main()
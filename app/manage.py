@@ -3,9 +3,17 @@
 import os
 import sys
 
+# Commands which need only news models and the database, they start much
+# faster without the web stack loaded.
+SLIM_SETTINGS_COMMANDS = {'fake_target', 'import_data', 'periodical_sync'}
+
 
 def main():
     """Run administrative tasks."""
+    if len(sys.argv) > 1 and sys.argv[1] in SLIM_SETTINGS_COMMANDS:
+        os.environ.setdefault(
+            'DJANGO_SETTINGS_MODULE', 'strouerapi.settings_commands'
+        )
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'strouerapi.settings')
     try:
         from django.core.management import execute_from_command_line
@@ -0,0 +1,258 @@
+"""Delivery of sync actions to the Target API."""
+import gzip
+import random
+import time
+from dataclasses import dataclass
+from datetime import timezone as dt_timezone
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from typing import TYPE_CHECKING, Callable
+
+from django.utils import timezone
+
+if TYPE_CHECKING:
+    import requests
+
+
+# Statuses which mean "try again later" rather than "your request is wrong".
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Smaller payloads don't get any shorter after gzip, it only costs CPU.
+GZIP_MIN_SIZE = 1024
+
+
+class DeliveryError(Exception):
+    """Action couldn't be delivered to the Target API.
+
+    `retryable` tells whether it makes sense to send the same action again,
+    `retry_after` (seconds) is a hint from the Target API when to do it.
+    """
+
+    def __init__(
+            self,
+            message: str,
+            retryable: bool = True,
+            retry_after: float | None = None
+        ):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class CircuitOpen(DeliveryError):
+    """Target API is considered unhealthy, nothing is being sent to it."""
+
+
+@dataclass
+class BackoffPolicy:
+    """Exponential backoff with full jitter."""
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    max_attempts: int = 4
+
+    def delay(self, attempt: int) -> float:
+        """Returns seconds to wait before the next attempt (counted from 0)."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parses `Retry-After` header, which is either seconds or HTTP-date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        # HTTP-dates are always in GMT, `-0000` zone comes out naive.
+        retry_at = retry_at.replace(tzinfo=dt_timezone.utc)
+    return max((retry_at - timezone.now()).total_seconds(), 0.0)
+
+
+class CircuitBreaker:
+    """Stops sending requests to the Target API while it keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    stays open for `reset_timeout` seconds. Then a single probe request is
+    let through (half-open): success closes the circuit, failure opens it
+    again.
+    """
+
+    class State(str, Enum):
+        CLOSED = "CLOSED"
+        OPEN = "OPEN"
+        HALF_OPEN = "HALF_OPEN"
+
+    def __init__(
+            self,
+            failure_threshold: int = 5,
+            reset_timeout: float = 30.0,
+            clock: Callable[[], float] = time.monotonic
+        ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+    @property
+    def state(self) -> State:
+        if self.opened_at is None:
+            return self.State.CLOSED
+        if self.remaining_open_time > 0:
+            return self.State.OPEN
+        return self.State.HALF_OPEN
+
+    @property
+    def is_open(self) -> bool:
+        """True if requests must not be sent right now."""
+        state = self.state
+        return state == self.State.OPEN or (
+            state == self.State.HALF_OPEN and self.probing
+        )
+
+    @property
+    def remaining_open_time(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(self.opened_at + self.reset_timeout - self.clock(), 0.0)
+
+    def allow_request(self) -> bool:
+        """Checks whether request could be sent, reserving half-open probe."""
+        if self.is_open:
+            return False
+        if self.state == self.State.HALF_OPEN:
+            self.probing = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+            self.probing = False
+
+
+class TargetAPIClient:
+    """HTTP client for the Target API with retries and circuit breaker.
+
+    `requests` is imported on the first use only: most of periodical syncs
+    have nothing to send and shouldn't pay for importing it.
+    """
+
+    def __init__(
+            self,
+            backoff: BackoffPolicy | None = None,
+            breaker: CircuitBreaker | None = None,
+            session: "requests.Session | None" = None,
+            timeout: float = 10.0,
+            sleep: Callable[[float], None] = time.sleep,
+            compress: bool = False
+        ):
+        self.backoff = backoff or BackoffPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self._session = session
+        self.timeout = timeout
+        self.sleep = sleep
+        self.compress = compress
+
+    @property
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def send(
+            self,
+            method: str,
+            url: str,
+            data: bytes | None = None
+        ) -> "requests.Response":
+        """Sends request, retrying it inline on transient failures.
+
+        Waits (with jittered backoff or as `Retry-After` says) between
+        attempts. If the Target API asks to wait longer than
+        `backoff.max_delay` or all attempts are used, raises retryable
+        `DeliveryError` so the action could be queued for later.
+
+        `data` is sent as is (gzipped once if compression is on), the same
+        bytes object is reused for all attempts.
+        """
+        import requests
+
+        headers = {"Content-Type": "application/json; charset=UTF-8"}
+        if self.compress and data is not None and len(data) >= GZIP_MIN_SIZE:
+            data = gzip.compress(data, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        for attempt in range(self.backoff.max_attempts):
+            if not self.breaker.allow_request():
+                raise CircuitOpen(
+                    f"Circuit is open, {method} {url} deferred",
+                    retry_after=self.breaker.remaining_open_time
+                )
+            retry_after = None
+            try:
+                response = self.session.request(
+                    method, url, data=data, headers=headers,
+                    timeout=self.timeout
+                )
+            except (
+                    requests.exceptions.InvalidURL,
+                    requests.exceptions.InvalidSchema,
+                    requests.exceptions.MissingSchema,
+                    requests.exceptions.InvalidHeader
+                ) as exc:
+                # Sending it again won't fix the request itself.
+                raise DeliveryError(
+                    f"{method} {url} is invalid: {exc}", retryable=False
+                )
+            except requests.RequestException as exc:
+                error = f"{method} {url} failed: {exc}"
+            else:
+                if response.ok or (
+                        method == "DELETE" and response.status_code == 404):
+                    # Missing object is exactly what DELETE wants to achieve.
+                    self.breaker.record_success()
+                    return response
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    # Target API is alive, it just doesn't like the request.
+                    self.breaker.record_success()
+                    raise DeliveryError(
+                        f"{method} {url} rejected with "
+                        f"{response.status_code}",
+                        retryable=False
+                    )
+                error = f"{method} {url} failed with {response.status_code}"
+                retry_after = parse_retry_after(
+                    response.headers.get("Retry-After")
+                )
+
+            self.breaker.record_failure()
+            if self.breaker.is_open:
+                # No point in waiting for the next attempt which won't happen.
+                raise CircuitOpen(
+                    f"{error}, circuit is open",
+                    retry_after=max(
+                        retry_after or 0, self.breaker.remaining_open_time
+                    )
+                )
+            is_last_attempt = attempt + 1 >= self.backoff.max_attempts
+            if is_last_attempt or (
+                    retry_after is not None
+                    and retry_after > self.backoff.max_delay):
+                raise DeliveryError(error, retry_after=retry_after)
+            print(f"{error}, retrying")
+            if retry_after is None:
+                retry_after = self.backoff.delay(attempt)
+            self.sleep(retry_after)
+
@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+
+# Range of 64-bit integer columns, SQLite fails on anything bigger.
+MIN_INT = -2 ** 63
+MAX_INT = 2 ** 63 - 1
+
+
+def parse_int(value: str) -> int:
+    """Parses integer which fits into a database column."""
+    number = int(value)
+    if not MIN_INT <= number <= MAX_INT:
+        raise ValueError(value)
+    return number
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parses ISO 8601 timestamp, naive ones are considered to be in UTC."""
+    timestamp = parse_datetime(value)
+    if timestamp is None:
+        raise ValueError(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """Filters list by `?search=` query param using model's full-text search.
+
+    Queryset is expected to be a `SearchQuerySet`.
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "").strip()
+        if not text:
+            return queryset
+        return queryset.search(text)
+
+
+class QueryParamsFilter(BaseFilterBackend):
+    """Filters list by query params listed in view's `filter_params`.
+
+    `filter_params` maps query param name to `(lookup, parse)` pair, where
+    `parse` converts raw value and raises `ValueError` if it's invalid.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        filters = {}
+        errors = {}
+        for param, (lookup, parse) in view.filter_params.items():
+            value = request.query_params.get(param, "").strip()
+            if not value:
+                continue
+            try:
+                filters[lookup] = parse(value)
+            except ValueError:
+                errors[param] = [f"Invalid value: '{value}'."]
+        if errors:
+            raise ValidationError(errors)
+        return queryset.filter(**filters)
@@ -0,0 +1,105 @@
+"""Fault-injecting stub of the Target API command."""
+import gzip
+import json
+import random
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+
+class FaultInjectingHandler(BaseHTTPRequestHandler):
+    """Accepts any request, but fails some of them on purpose.
+
+    Failure rates are set on the server instance by the command.
+    """
+
+    def _respond(self, status: int, payload: dict | None = None, headers=None):
+        body = json.dumps(payload or {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, success_status: int):
+        length = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(length) if length else b""
+        if data and self.headers.get("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+
+        server = self.server
+        if server.outage_left > 0:
+            server.outage_left -= 1
+            return self._respond(503, {"error": "outage"})
+        roll = server.random.random()
+        if roll < server.throttle_rate:
+            return self._respond(
+                429,
+                {"error": "too many requests"},
+                {"Retry-After": str(server.retry_after)}
+            )
+        if roll < server.throttle_rate + server.error_rate:
+            return self._respond(503, {"error": "unavailable"})
+        self._respond(success_status, json.loads(data) if data else {})
+
+    def do_POST(self):
+        self._handle(201)
+
+    def do_PUT(self):
+        self._handle(200)
+
+    def do_DELETE(self):
+        self._handle(200)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local stub of the Target API which randomly throttles and "
+        "fails requests. Point SYNC_TARGET_URL at it to check how sync "
+        "deals with an unhealthy Target API."
+    )
+    # Has nothing to do with the project state, no need to check it.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8001)
+        parser.add_argument(
+            "--error-rate", type=float, default=0.2,
+            help="Share of requests answered with 503."
+        )
+        parser.add_argument(
+            "--throttle-rate", type=float, default=0.1,
+            help="Share of requests answered with 429."
+        )
+        parser.add_argument(
+            "--retry-after", type=int, default=1,
+            help="Retry-After value (seconds) sent with 429 responses."
+        )
+        parser.add_argument(
+            "--outage", type=int, default=0,
+            help="Amount of first requests answered with 503."
+        )
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args: Any, **options: Any) -> str | None:
+        server = ThreadingHTTPServer(
+            ("0.0.0.0", options["port"]), FaultInjectingHandler
+        )
+        server.error_rate = options["error_rate"]
+        server.throttle_rate = options["throttle_rate"]
+        server.retry_after = options["retry_after"]
+        server.outage_left = options["outage"]
+        server.random = random.Random(options["seed"])
+
+        self.stdout.write(
+            f"Fake Target API is listening on port {options['port']}"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
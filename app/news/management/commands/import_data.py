@@ -2,7 +2,6 @@
 from datetime import datetime
 from itertools import islice
 from typing import Any, Literal
-import requests
 
 from django.core.management.base import BaseCommand
 from django.db import connection, transaction
@@ -21,6 +20,8 @@ def check_that_tables_are_empty() -> bool:
 
 def get_list_of_entries(resource: Resource) -> list[dict]:
     """Fetch the data from Fake API, scheck, parse and return it."""
+    import requests  # heavy, imported only when the import really happens
+
     res = requests.get(f"{BASE_URL}/{resource}", timeout=10)
     res.raise_for_status() 
     return res.json()
@@ -40,6 +41,8 @@ def update_db_sequences() -> None:
 
 class Command(BaseCommand):
     help = "Import initial Posts and Comments data into database."
+    # Runs with slim settings (see manage.py), skip checks like the sync does.
+    requires_system_checks = []
 
     def handle(self, *args: Any, **options: Any) -> str | None:
         start = datetime.now()
@@ -4,11 +4,14 @@ from typing import Any
 
 from django.core.management.base import BaseCommand
 
-from news.sync import SyncManager, NothingToSync
+from news.sync import SyncManager, NothingToSync, SyncInProgress
 
 
 class Command(BaseCommand):
     help = "Sync unsynced data."
+    # Checks import the whole project (URLs, admin, DRF), which is what slim
+    # settings are meant to avoid. They are run by `migrate` and `runserver`.
+    requires_system_checks = []
 
     def handle(self, *args: Any, **options: Any) -> str | None:
         start = datetime.now()
@@ -33,3 +36,10 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.WARNING(f"{end_str}: Nothing to sync.")
             )
+        except SyncInProgress:
+            end_str = datetime.now().strftime("%m/%d/%Y, %H:%M:%S")
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{end_str}: Previous sync is still running."
+                )
+            )
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0002_modelevent_alter_comment_id_alter_post_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRetry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_table', models.CharField(max_length=128)),
+                ('entity_pk', models.PositiveIntegerField()),
+                ('type', models.CharField(choices=[('CREATED', 'Created'), ('DELETED', 'Deleted'), ('UPDATED', 'Updated')], max_length=16)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('next_attempt_at', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
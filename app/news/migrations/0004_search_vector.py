@@ -0,0 +1,88 @@
+# Generated by Django 4.2.11 on 2026-10-19 13:57
+
+import django.contrib.postgres.search
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations
+
+
+# Keeps `search_vector` up to date on every write, including bulk ones.
+TRIGGERS = {
+    "news_post": (
+        "title, body",
+        "setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(NEW.body, '')), 'B')"
+    ),
+    "news_comment": (
+        "name, email, body",
+        "setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(NEW.email, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(NEW.body, '')), 'B')"
+    ),
+}
+
+
+def create_search_triggers(apps, schema_editor):
+    """Creates GIN indexes and triggers, only PostgreSQL supports them."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for model_name, table in (("Post", "news_post"), ("Comment", "news_comment")):
+        schema_editor.add_index(
+            apps.get_model("news", model_name),
+            GinIndex(fields=["search_vector"], name=f"{table}_search_gin")
+        )
+    for table, (columns, vector) in TRIGGERS.items():
+        schema_editor.execute(f"""
+            CREATE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {vector};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER {table}_search_vector_update
+            BEFORE INSERT OR UPDATE OF {columns} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update();
+        """)
+        # Fill in the vector for already existing rows.
+        first_column = columns.split(",")[0]
+        schema_editor.execute(
+            f"UPDATE {table} SET {first_column} = {first_column};"
+        )
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in TRIGGERS:
+        schema_editor.execute(f"""
+            DROP TRIGGER IF EXISTS {table}_search_vector_update ON {table};
+            DROP FUNCTION IF EXISTS {table}_search_vector_update();
+        """)
+    for model_name, table in (("Post", "news_post"), ("Comment", "news_comment")):
+        schema_editor.remove_index(
+            apps.get_model("news", model_name),
+            GinIndex(fields=["search_vector"], name=f"{table}_search_gin")
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_syncretry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # GIN index isn't part of the models' state: on other databases it
+        # would become a useless B-tree index.
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
@@ -1,7 +1,16 @@
 """Models"""
-import json
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator
 
-from django.db import models
+import orjson
+from django.contrib.postgres.search import SearchQuery, SearchVectorField
+from django.db import connections, models
+from django.db.models import DEFERRED, Q
+
+
+# Text search configuration used by `search_vector` columns and queries.
+SEARCH_CONFIG = "english"
     
 
 class ModelEventQuerySet(models.QuerySet):
@@ -35,8 +44,199 @@ class ModelEvent(models.Model):
         )
 
 
+def compact_events(events: Iterable) -> Iterator:
+    """Reduces events to a single most important event per object.
+
+    Events are anything with `entity_table`, `entity_pk` and `type`
+    attributes (Model Events, queued Sync Actions) in the order they happened.
+    Selected events are returned in the original order.
+    """
+    events = list(events)
+    # Reduce amount of actions to only one for each object.
+    main_actions = defaultdict(dict)
+    for event in events:
+        if event.entity_pk not in main_actions[event.entity_table]:
+            # If this is the first appearance of action on this object -
+            # save it.
+            main_actions[event.entity_table][event.entity_pk] = event.type
+        else:
+            # If this is not the first appearance of action on this object -
+            # compare it and leave only most important.
+            prev_type = main_actions[event.entity_table][event.entity_pk]
+            if (prev_type == ModelEvent.EventType.CREATED and 
+                    event.type == ModelEvent.EventType.DELETED):
+                # Remove all events for this object because it was created
+                # and removed within the same batch of events.
+                del main_actions[event.entity_table][event.entity_pk]
+            elif (prev_type == ModelEvent.EventType.UPDATED and 
+                    event.type == ModelEvent.EventType.DELETED):
+                # Save only final deletion event.
+                main_actions[event.entity_table][
+                    event.entity_pk
+                ] = event.type
+            # Otherwise keep previous action in place as the main action.
+    # Return selected events one by one with preserved order.
+    for event in events:
+        object_actions = main_actions[event.entity_table]
+        if object_actions.get(event.entity_pk) == event.type:
+            # Pop the action so that it is yielded only once.
+            del object_actions[event.entity_pk]
+            yield event
+
+
+class SyncRetryQuerySet(models.QuerySet):
+    """Queue of Sync Actions which failed to be delivered to the Target API."""
+
+    def due(self, now):
+        """Entries which are ready to be retried at the given moment."""
+        return self.filter(next_attempt_at__lte=now)
+
+
+class SyncRetry(models.Model):
+    """Sync Action waiting for another delivery attempt.
+
+    Unlike Model Events, which are marked as synced at the end of each sync,
+    entries live here until the action is finally delivered (or superseded by
+    newer changes of the same object).
+    """
+
+    entity_table = models.CharField(max_length=128)
+    entity_pk = models.PositiveIntegerField()
+    type = models.CharField(
+        max_length=16, choices=ModelEvent.EventType.choices)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = SyncRetryQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return (
+            f"SyncRetry(id={self.id}, entity_table={self.entity_table}, "
+            f"entity_pk={self.entity_pk}, type={self.type}, "
+            f"attempts={self.attempts})"
+        )
+
+
+class SearchQuerySet(models.QuerySet):
+    """QuerySet of models having full-text `search_vector` column.
+
+    On PostgreSQL `search_vector` is kept up to date by a trigger and backed
+    by a GIN index. Other databases (SQLite in local development) fall back
+    to `LIKE` over `SEARCH_FIELDS` of the model.
+    """
+
+    def search(self, text: str):
+        """Filters objects matching the search text."""
+        if connections[self.db].vendor == "postgresql":
+            return self.filter(search_vector=SearchQuery(
+                text, config=SEARCH_CONFIG, search_type="websearch"
+            ))
+        condition = Q()
+        for field in self.model.SEARCH_FIELDS:
+            condition |= Q(**{f"{field}__icontains": text})
+        return self.filter(condition)
+
+
+class StaleObjectError(Exception):
+    """Object was modified by someone else since it was read."""
+
+
 class TrackedModelMixin:
-    """TODO Write docs"""
+    """Logs changes of the model into Model Events.
+
+    Keeps values loaded from the database, so that `save()` writes only
+    changed fields and skips saving (and logging) completely if nothing has
+    changed. Model is expected to have `updated_at` field, it is used as a
+    version for conditional updates (see `expect_etag`).
+    """
+
+    _EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if value is not DEFERRED
+        }
+        return instance
+
+    @property
+    def changed_fields(self) -> list[str]:
+        """Fields whose values differ from the ones loaded from database."""
+        loaded = self._loaded_values
+        return [
+            field.attname for field in self._meta.concrete_fields
+            if field.attname in loaded
+            and getattr(self, field.attname) != loaded[field.attname]
+        ]
+
+    @property
+    def etag(self) -> str:
+        """Version of the object for `ETag` and `If-Match` HTTP headers."""
+        version = (self.updated_at - self._EPOCH) // timedelta(microseconds=1)
+        return f'"{version}"'
+
+    def expect_etag(self, etag: str):
+        """Makes the next `save()` succeed only if object has this version.
+
+        The check is a part of the UPDATE statement itself, so it doesn't
+        need to read the object once again.
+        """
+        if etag != self.etag:
+            raise StaleObjectError()
+        self._expected_updated_at = self.updated_at
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and kwargs.get("update_fields") is None
+                and hasattr(self, "_loaded_values")):
+            changed_fields = self.changed_fields
+            # Empty `update_fields` makes Django skip the save and signals.
+            if changed_fields:
+                changed_fields.append("updated_at")
+            kwargs["update_fields"] = changed_fields
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            self._expected_updated_at = None
+        # Only written fields match the database now.
+        self._remember_values(kwargs.get("update_fields"))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        self._remember_values(fields)
+
+    def _remember_values(self, field_names: Iterable[str] | None = None):
+        """Takes current values of the fields as the ones in the database."""
+        if field_names is None:
+            deferred_fields = self.get_deferred_fields()
+            self._loaded_values = {
+                field.attname: getattr(self, field.attname)
+                for field in self._meta.concrete_fields
+                if field.attname not in deferred_fields
+            }
+        elif hasattr(self, "_loaded_values"):
+            # Without full snapshot every field is saved anyway.
+            for name in field_names:
+                attname = self._meta.get_field(name).attname
+                self._loaded_values[attname] = getattr(self, attname)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        expected_updated_at = getattr(self, "_expected_updated_at", None)
+        if expected_updated_at is None:
+            return super()._do_update(
+                base_qs, using, pk_val, values, update_fields, forced_update
+            )
+        updated = super()._do_update(
+            base_qs.filter(updated_at=expected_updated_at), using, pk_val,
+            values, update_fields, forced_update
+        )
+        if not updated:
+            raise StaleObjectError()
+        return updated
 
     def log_event(self, event_type: ModelEvent.EventType):
         print(f"{self} {event_type}")
@@ -57,15 +257,22 @@ class TrackedModelMixin:
         self.log_event(ModelEvent.EventType.UPDATED)
 
 
-class Post(models.Model, TrackedModelMixin):
+class Post(TrackedModelMixin, models.Model):
     """TODO Write docs"""
 
     user_id = models.PositiveIntegerField()
     title = models.CharField(max_length=256)
     body = models.CharField(max_length=1024)
+    search_vector = SearchVectorField(null=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    SEARCH_FIELDS = ("title", "body")
+
+    objects = SearchQuerySet.as_manager()
 
-    def to_sync_format(self):
-        return json.dumps({
+    def to_sync_format(self) -> bytes:
+        return orjson.dumps({
             "id": self.id,
             "userId": self.user_id,
             "title": self.title,
@@ -77,19 +284,39 @@ class Post(models.Model, TrackedModelMixin):
 
     class Meta:
         db_table = "news_post"
+        # Filtered lists are ordered by "-id", so are the composite indexes.
+        # GIN index on `search_vector` exists on PostgreSQL only, it's created
+        # by a migration and isn't listed here to keep it out of other DBs.
+        indexes = [
+            models.Index(
+                fields=["user_id", "-id"], name="news_post_user_id_idx"
+            ),
+            models.Index(
+                fields=["updated_at"], name="news_post_updated_at_idx"
+            ),
+        ]
 
 
-class Comment(models.Model, TrackedModelMixin):
+class Comment(TrackedModelMixin, models.Model):
     """TODO Write docs"""
 
     post = models.ForeignKey(
-        Post, related_name="comments", on_delete=models.CASCADE)
+        Post, related_name="comments", on_delete=models.CASCADE,
+        db_index=False  # covered by ("post", "-id") index
+    )
     name = models.CharField(max_length=128)
     email = models.EmailField(max_length=128)
     body = models.CharField(max_length=1024)
+    search_vector = SearchVectorField(null=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    SEARCH_FIELDS = ("name", "email", "body")
+
+    objects = SearchQuerySet.as_manager()
 
-    def to_sync_format(self):
-        return json.dumps({
+    def to_sync_format(self) -> bytes:
+        return orjson.dumps({
             "id": self.id,
             "postId": self.post_id,
             "name": self.name,
@@ -102,3 +329,14 @@ class Comment(models.Model, TrackedModelMixin):
 
     class Meta:
         db_table = "news_comment"
+        # Filtered lists are ordered by "-id", so are the composite indexes.
+        # See Post for the `search_vector` index.
+        indexes = [
+            models.Index(fields=["post", "-id"], name="news_comment_post_idx"),
+            models.Index(
+                fields=["email", "-id"], name="news_comment_email_idx"
+            ),
+            models.Index(
+                fields=["updated_at"], name="news_comment_updated_at_idx"
+            ),
+        ]
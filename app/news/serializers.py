@@ -1,16 +1,28 @@
 from rest_framework import serializers
 
-from .models import Comment, Post
+from .models import Comment, ModelEvent, Post
 
 
 class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
-        fields = ["id", "post_id", "name", "email", "body"]
+        fields = [
+            "id", "post_id", "name", "email", "body", "created_at",
+            "updated_at"
+        ]
+        read_only_fields = ["created_at", "updated_at"]
 
 
 class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
-        fields = ["id", "user_id", "title", "body"]
-        read_only_fields = ["user_id"]
+        fields = [
+            "id", "user_id", "title", "body", "created_at", "updated_at"
+        ]
+        read_only_fields = ["user_id", "created_at", "updated_at"]
+
+
+class ModelEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ModelEvent
+        fields = ["entity_table", "entity_pk", "type", "logged_at"]
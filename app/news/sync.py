@@ -1,20 +1,61 @@
 from collections import defaultdict
+from contextlib import contextmanager
 from dataclasses import dataclass
+from datetime import timedelta
+from functools import cached_property
 from typing import Iterator
 
-from django.db import transaction
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection, transaction
+from django.db.models import Q
 from django.utils import timezone
 
-from .models import Comment, ModelEvent, Post
+from .delivery import BackoffPolicy, DeliveryError, TargetAPIClient
+from .models import Comment, ModelEvent, Post, SyncRetry, compact_events
 
 
-BASE_TARGET_URL = "https://jsonplaceholder.typicode.com"
+BASE_TARGET_URL = settings.SYNC_TARGET_URL
+
+# Backoff between sync runs for actions sitting in the retry queue.
+RETRY_QUEUE_BACKOFF = BackoffPolicy(base_delay=60, max_delay=60 * 60)
+
+
+# Key of PostgreSQL advisory lock held by the running periodical sync.
+SYNC_LOCK_ID = 0x5e9c
 
 
 class NothingToSync(Exception):
     pass
 
 
+class SyncInProgress(Exception):
+    pass
+
+
+@contextmanager
+def sync_lock():
+    """Makes sure only one periodical sync runs at a time.
+
+    Sync may take longer than the cron interval (e.g. while the Target API
+    throttles it), and two runs would deliver the same events twice. The lock
+    is bound to the DB session, so it's released even if the run is killed.
+    Other databases are for development only and aren't locked.
+    """
+    if connection.vendor != "postgresql":
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [SYNC_LOCK_ID])
+        if not cursor.fetchone()[0]:
+            raise SyncInProgress()
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [SYNC_LOCK_ID])
+
+
 @dataclass
 class ModelSyncSettings:
     model: Comment | Post
@@ -36,6 +77,7 @@ class SyncAction:
     db_table: str
     object_id: int
     event_type: ModelEvent.EventType
+    attempts: int = 0
 
     __sync_settings_from_table_name = {
         Comment._meta.db_table: CommentSyncSettings,
@@ -46,82 +88,204 @@ class SyncAction:
     def sync_settings(self) -> ModelSyncSettings:
         return self.__sync_settings_from_table_name[self.db_table]
     
-    @property
-    def data(self) -> str | None:
+    @cached_property
+    def instance(self) -> Comment | Post | None:
         if self.event_type == ModelEvent.EventType.DELETED:
             return None
         model = self.sync_settings.model
-        return model.objects.get(pk=self.object_id).to_sync_format()
+        return model.objects.get(pk=self.object_id)
+
+    @cached_property
+    def data(self) -> bytes | None:
+        """JSON payload, encoded once and reused for logs and all attempts."""
+        if self.instance is None:
+            return None
+        return self.instance.to_sync_format()
     
-    def perform(self):
+    def perform(self, client: TargetAPIClient):
         match self.event_type:
             case ModelEvent.EventType.CREATED:
+                method = "POST"
                 url = self.sync_settings.list_url
-                print(f"POST {url} data='{self.data}'")
             case ModelEvent.EventType.UPDATED:
+                method = "PUT"
                 url = f"{self.sync_settings.list_url}/{self.object_id}/"
-                print(f"PUT {url} data='{self.data}'")
             case ModelEvent.EventType.DELETED:
+                method = "DELETE"
                 url = f"{self.sync_settings.list_url}/{self.object_id}/"
-                print(f"DELETE {url}")
+        data = self.data
+        if data is None:
+            print(f"{method} {url}")
+        else:
+            print(f"{method} {url} data='{data.decode()}'")
+        client.send(method, url, data)
 
 
 class SyncManager:
     actions = None
-    model_events_qs = None
+    start_time = None
     model_events = None
+    retries = None
+    queued_posts = None
+    pending_events = None
+    pending_retries = None
+
+    def __init__(self, client: TargetAPIClient | None = None):
+        self.client = client or TargetAPIClient(
+            compress=settings.SYNC_TARGET_GZIP
+        )
 
     def _get_sync_actions(self) -> Iterator[SyncAction]:
         """Creates sync actions based on unsynced Model Events.
 
         It reduces amount of actions for each object to 1, by ignoring/removing
-        redundant actions from Model Events log.
+        redundant actions from Model Events log. Actions from the retry queue
+        are treated as the oldest events, so newer changes are merged on top
+        of them.
         """
-        # Reduce amount of actions to only one for each object.
-        main_actions = defaultdict(dict)
+        events = [*self.retries, *self.model_events]
+        attempts = {
+            (retry.entity_table, retry.entity_pk): retry.attempts
+            for retry in self.retries
+        }
+        for event in compact_events(events):
+            yield SyncAction(
+                db_table=event.entity_table,
+                object_id=event.entity_pk,
+                event_type=event.type,
+                attempts=attempts.get((event.entity_table, event.entity_pk), 0)
+            )
+
+    def _get_retries(self, now) -> list[SyncRetry]:
+        """Returns queued actions which are due or affected by new events."""
+        condition = Q(next_attempt_at__lte=now)
+        changed_pks = defaultdict(set)
         for event in self.model_events:
-            if event.entity_pk not in main_actions[event.entity_table]:
-                # If this is the first appearance of action on this object -
-                # save it.
-                main_actions[event.entity_table][event.entity_pk] = event.type
+            changed_pks[event.entity_table].add(event.entity_pk)
+        for table, pks in changed_pks.items():
+            condition |= Q(entity_table=table, entity_pk__in=pks)
+        return list(SyncRetry.objects.filter(condition).order_by("id"))
+
+    def _get_queued_parent(self, action: SyncAction) -> int | None:
+        """Returns id of action's Post if its creation is still queued."""
+        if (action.db_table != Comment._meta.db_table
+                or action.event_type == ModelEvent.EventType.DELETED):
+            return None
+        post_id = action.instance.post_id
+        return post_id if post_id in self.queued_posts else None
+
+    def _deliver(self, action: SyncAction) -> SyncRetry | None:
+        """Performs the action, returns its retry on failure."""
+        next_attempt_at = None
+        try:
+            parent_id = self._get_queued_parent(action)
+            if parent_id is not None:
+                # Comment can't be created before its Post, so it waits and
+                # gets retried right after the Post.
+                next_attempt_at = self.queued_posts[parent_id]
+                error = f"Waiting for Post(id={parent_id}) to be synced"
+            elif self.client.breaker.is_open:
+                # Don't even try while Target API is unhealthy.
+                delay = self.client.breaker.remaining_open_time
+                error = "Deferred while circuit is open"
             else:
-                # If this is not the first appearance of action on this object -
-                # compare it and leave only most important.
-                prev_type = main_actions[event.entity_table][event.entity_pk]
-                if (prev_type == ModelEvent.EventType.CREATED and 
-                        event.type == ModelEvent.EventType.DELETED):
-                    # Remove all events for this object because it was created
-                    # and removed during one sync time frame.
-                    del main_actions[event.entity_table][event.entity_pk]
-                elif (prev_type == ModelEvent.EventType.UPDATED and 
-                        event.type == ModelEvent.EventType.DELETED):
-                    # Save only final deletion event.
-                    main_actions[event.entity_table][
-                        event.entity_pk
-                    ] = event.type
-                # Otherwise keep previous action in place as the main action.
-        # Return selected events one by one with preserved order.
-        for event in self.model_events:
-            if main_actions[event.entity_table][event.entity_pk] == event.type:
-                yield SyncAction(
-                    db_table=event.entity_table,
-                    object_id=event.entity_pk,
-                    event_type=event.type
-                )
-                
-
-    @transaction.atomic
+                action.perform(self.client)
+                return None
+        except ObjectDoesNotExist:
+            # Deleted after its events were read, the deletion event is
+            # synced next time.
+            print(
+                f"{action.db_table} id={action.object_id} is deleted, "
+                "skipping the action"
+            )
+            return None
+        except DeliveryError as exc:
+            if not exc.retryable:
+                print(f"{exc}, dropping the action")
+                return None
+            delay = exc.retry_after
+            error = str(exc)
+            action.attempts += 1
+        if next_attempt_at is None:
+            if delay is None:
+                delay = RETRY_QUEUE_BACKOFF.delay(action.attempts)
+            next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        print(f"{error}, will retry at {next_attempt_at:%H:%M:%S}")
+        if (action.db_table == Post._meta.db_table
+                and action.event_type == ModelEvent.EventType.CREATED):
+            self.queued_posts[action.object_id] = next_attempt_at
+        return SyncRetry(
+            entity_table=action.db_table,
+            entity_pk=action.object_id,
+            type=action.event_type,
+            attempts=action.attempts,
+            last_error=error,
+            next_attempt_at=next_attempt_at
+        )
+
+    def _save_outcome(
+            self,
+            keys: list[tuple[str, int]],
+            retry: SyncRetry | None = None
+        ):
+        """Marks events and retries of the objects as done.
+
+        Taken retries are either delivered now or replaced by the new
+        `retry`. Only events read at the start are synced, the ones logged
+        during the sync will be picked up next time.
+        """
+        event_pks = [
+            pk for key in keys for pk in self.pending_events.pop(key, [])
+        ]
+        retry_pks = [
+            pk for key in keys for pk in self.pending_retries.pop(key, [])
+        ]
+        with transaction.atomic():
+            SyncRetry.objects.filter(pk__in=retry_pks).delete()
+            if retry is not None:
+                retry.save()
+            ModelEvent.objects.filter(pk__in=event_pks).update(
+                synced_at=self.start_time
+            )
+
     def start_periodical_sync(self):
-        start_time = timezone.now()
+        with sync_lock():
+            self._sync()
 
-        self.model_events_qs = ModelEvent.objects.unsynced()
-        self.model_events = self.model_events_qs.all()
-        if not self.model_events:
-            raise NothingToSync()
+    def _sync(self):
+        self.start_time = timezone.now()
 
-        for action in self._get_sync_actions():
-            action.perform()
+        self.model_events = list(ModelEvent.objects.unsynced().order_by("id"))
+        self.retries = self._get_retries(self.start_time)
+        if not self.model_events and not self.retries:
+            raise NothingToSync()
 
-        self.model_events_qs.update(synced_at=start_time)
+        # Posts whose creation stays in the queue, mapped to its next attempt.
+        self.queued_posts = dict(
+            SyncRetry.objects.filter(
+                entity_table=Post._meta.db_table,
+                type=ModelEvent.EventType.CREATED
+            ).exclude(
+                pk__in=[retry.pk for retry in self.retries]
+            ).values_list("entity_pk", "next_attempt_at")
+        )
 
+        self.pending_events = defaultdict(list)
+        for event in self.model_events:
+            self.pending_events[event.entity_table, event.entity_pk].append(
+                event.pk
+            )
+        self.pending_retries = defaultdict(list)
+        for retry in self.retries:
+            self.pending_retries[retry.entity_table, retry.entity_pk].append(
+                retry.pk
+            )
 
+        # Requests and waits between their attempts are done outside of
+        # transaction. Outcome of each action is saved right after it, so
+        # delivered actions aren't sent again if the run breaks midway.
+        for action in self._get_sync_actions():
+            retry = self._deliver(action)
+            self._save_outcome([(action.db_table, action.object_id)], retry)
+        # The rest are objects created and deleted in between, nothing to do.
+        self._save_outcome([*self.pending_events, *self.pending_retries])
@@ -1,3 +1,711 @@
+import base64
+import contextlib
+import io
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import transaction
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .delivery import (
+    BackoffPolicy, CircuitBreaker, CircuitOpen, DeliveryError,
+    TargetAPIClient, parse_retry_after
+)
+from .management.commands.fake_target import FaultInjectingHandler
+from .models import Comment, ModelEvent, Post, StaleObjectError, SyncRetry
+from .sync import (
+    CommentSyncSettings, PostSyncSettings, SyncAction, SyncManager
+)
+from .views import ChangeFeedView
+
+
+class RecordingHandler(FaultInjectingHandler):
+    """Fake Target API handler which remembers requests and keeps quiet."""
+
+    def _handle(self, success_status: int):
+        self.server.requests.append((self.command, self.path))
+        super()._handle(success_status)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeTargetTestCase(TestCase):
+    """Runs fault-injecting stub of the Target API in a background thread."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RecordingHandler)
+        self.server.error_rate = 0.0
+        self.server.throttle_rate = 0.0
+        self.server.retry_after = 1
+        self.server.outage_left = 0
+        self.server.random = random.Random(0)
+        self.server.requests = []
+        thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}
+        )
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+        self.sleeps = []
+        self.clock = FakeClock()
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+
+    def make_client(self, **backoff) -> TargetAPIClient:
+        return TargetAPIClient(
+            backoff=BackoffPolicy(**backoff),
+            breaker=CircuitBreaker(
+                failure_threshold=3, reset_timeout=30, clock=self.clock
+            ),
+            sleep=self.sleeps.append
+        )
+
+
+class BackoffPolicyTests(TestCase):
+    def test_delay_is_jittered_up_to_capped_exponent(self):
+        policy = BackoffPolicy(base_delay=1, max_delay=10)
+        for attempt, ceiling in enumerate([1, 2, 4, 8, 10, 10]):
+            delays = [policy.delay(attempt) for _ in range(50)]
+            self.assertTrue(all(0 <= delay <= ceiling for delay in delays))
+            self.assertGreater(len(set(delays)), 1)
+
+
+class ParseRetryAfterTests(TestCase):
+    def test_delay_seconds(self):
+        self.assertEqual(parse_retry_after(" 120 "), 120.0)
+
+    def test_http_date(self):
+        retry_at = timezone.now() + timedelta(minutes=2)
+        for zone in ("GMT", "+0000", "-0000"):
+            value = retry_at.strftime(f"%a, %d %b %Y %H:%M:%S {zone}")
+            with self.subTest(zone=zone):
+                self.assertAlmostEqual(
+                    parse_retry_after(value), 120, delta=2
+                )
+
+    def test_http_date_in_the_past(self):
+        self.assertEqual(
+            parse_retry_after("Wed, 21 Oct 2015 07:28:00 -0000"), 0.0
+        )
+
+    def test_invalid_value(self):
+        for value in (None, "", "soon", "-5"):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_retry_after(value))
+
+
+class TargetAPIClientTests(FakeTargetTestCase):
+    def test_retries_transient_failures_with_backoff(self):
+        self.server.outage_left = 2
+        client = self.make_client(base_delay=1, max_delay=10)
+
+        client.send("POST", f"{self.url}/posts", b"{}")
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertLessEqual(self.sleeps[0], 1)
+        self.assertLessEqual(self.sleeps[1], 2)
+
+    def test_honours_retry_after(self):
+        self.server.throttle_rate = 1.0
+        self.server.retry_after = 2
+        client = self.make_client(max_attempts=2, max_delay=10)
+
+        with self.assertRaises(DeliveryError) as error:
+            client.send("PUT", f"{self.url}/posts/1/", b"{}")
+
+        self.assertEqual(self.sleeps, [2.0])
+        self.assertTrue(error.exception.retryable)
+        self.assertEqual(error.exception.retry_after, 2.0)
+
+    def test_doesnt_wait_inline_longer_than_max_delay(self):
+        self.server.throttle_rate = 1.0
+        self.server.retry_after = 60
+        client = self.make_client(max_delay=10)
+
+        with self.assertRaises(DeliveryError) as error:
+            client.send("PUT", f"{self.url}/posts/1/", b"{}")
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(error.exception.retry_after, 60.0)
+
+    def test_breaker_opens_without_waiting(self):
+        self.server.error_rate = 1.0
+        client = self.make_client(max_attempts=10)
+
+        with self.assertRaises(CircuitOpen):
+            client.send("POST", f"{self.url}/posts", b"{}")
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.sleeps), 2)
+
+        with self.assertRaises(CircuitOpen):
+            client.send("POST", f"{self.url}/posts", b"{}")
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(client.breaker.state, CircuitBreaker.State.OPEN)
+
+    def test_half_open_breaker_probes_once(self):
+        self.server.error_rate = 1.0
+        client = self.make_client(max_attempts=10)
+        with self.assertRaises(CircuitOpen):
+            client.send("POST", f"{self.url}/posts", b"{}")
+
+        # Failed probe opens the circuit again.
+        self.clock.now += 30
+        self.assertEqual(client.breaker.state, CircuitBreaker.State.HALF_OPEN)
+        with self.assertRaises(CircuitOpen):
+            client.send("POST", f"{self.url}/posts", b"{}")
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual(client.breaker.state, CircuitBreaker.State.OPEN)
+
+        # Successful probe closes it.
+        self.clock.now += 30
+        self.server.error_rate = 0.0
+        client.send("POST", f"{self.url}/posts", b"{}")
+        self.assertEqual(client.breaker.state, CircuitBreaker.State.CLOSED)
+
+
+class SyncManagerRetryQueueTests(FakeTargetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch.object(
+            PostSyncSettings, "list_url", f"{self.url}/posts"
+        ))
+        self.enterContext(mock.patch.object(
+            CommentSyncSettings, "list_url", f"{self.url}/comments"
+        ))
+
+    def sync(self):
+        SyncManager(self.make_client(max_attempts=1)).start_periodical_sync()
+
+    def make_queue_due(self):
+        SyncRetry.objects.update(next_attempt_at=timezone.now())
+
+    def test_failed_action_is_queued_and_retried(self):
+        post = Post.objects.create(user_id=1, title="T", body="B")
+        self.server.outage_left = 1
+        self.sync()
+
+        retry = SyncRetry.objects.get()
+        self.assertEqual(
+            (retry.entity_pk, retry.type, retry.attempts),
+            (post.id, ModelEvent.EventType.CREATED, 1)
+        )
+        self.assertFalse(ModelEvent.objects.unsynced().exists())
+
+        self.make_queue_due()
+        self.sync()
+        self.assertFalse(SyncRetry.objects.exists())
+        self.assertEqual(self.server.requests[-1], ("POST", "/posts"))
+
+    def test_queued_creation_is_merged_with_deletion(self):
+        post = Post.objects.create(user_id=1, title="T", body="B")
+        self.server.outage_left = 1
+        self.sync()
+        post.delete()
+
+        # Not due yet, but the object has changed since.
+        self.sync()
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertFalse(SyncRetry.objects.exists())
+
+    def test_comment_waits_for_its_queued_post(self):
+        post = Post.objects.create(user_id=1, title="T", body="B")
+        Comment.objects.create(post=post, name="N", email="a@b.cd", body="C")
+        self.server.outage_left = 1
+        self.sync()
+
+        post_retry, comment_retry = SyncRetry.objects.order_by("id")
+        self.assertEqual(post_retry.entity_table, "news_post")
+        self.assertEqual(comment_retry.entity_table, "news_comment")
+        self.assertEqual(
+            comment_retry.next_attempt_at, post_retry.next_attempt_at
+        )
+        self.assertEqual(self.server.requests, [("POST", "/posts")])
+
+        # Comment alone becomes due, it keeps waiting for the Post.
+        comment_retry.next_attempt_at = timezone.now()
+        comment_retry.save()
+        SyncRetry.objects.filter(pk=post_retry.pk).update(
+            next_attempt_at=timezone.now() + timedelta(hours=1)
+        )
+        self.sync()
+        self.assertEqual(len(self.server.requests), 1)
+
+        self.make_queue_due()
+        self.sync()
+        self.assertEqual(
+            self.server.requests[1:],
+            [("POST", "/posts"), ("POST", "/comments")]
+        )
+        self.assertFalse(SyncRetry.objects.exists())
+
+
+    def test_object_deleted_during_sync_is_skipped(self):
+        post = Post.objects.create(user_id=1, title="T", body="B")
+        get_retries = SyncManager._get_retries
+
+        def delete_post(manager, now):
+            # Post is deleted after its events have been read.
+            post.delete()
+            return get_retries(manager, now)
+
+        with mock.patch.object(
+                SyncManager, "_get_retries", autospec=True,
+                side_effect=delete_post):
+            self.sync()
+
+        self.assertEqual(self.server.requests, [])
+        self.assertFalse(SyncRetry.objects.exists())
+        self.assertEqual(
+            list(ModelEvent.objects.unsynced().values_list("type", flat=True)),
+            [ModelEvent.EventType.DELETED]
+        )
+
+    def test_delivered_actions_are_saved_if_sync_breaks(self):
+        Post.objects.create(user_id=1, title="T", body="B")
+        second = Post.objects.create(user_id=1, title="T", body="B")
+        perform = SyncAction.perform
+
+        def break_on_second(action, client):
+            if action.object_id == second.id:
+                raise RuntimeError("Sync is killed")
+            return perform(action, client)
+
+        with mock.patch.object(
+                SyncAction, "perform", autospec=True,
+                side_effect=break_on_second):
+            with self.assertRaises(RuntimeError):
+                self.sync()
+
+        self.assertEqual(
+            list(ModelEvent.objects.unsynced().values_list(
+                "entity_pk", flat=True
+            )),
+            [second.id]
+        )
+        self.sync()
+        self.assertEqual(
+            self.server.requests, [("POST", "/posts"), ("POST", "/posts")]
+        )
+        self.assertFalse(ModelEvent.objects.unsynced().exists())
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+        user = User.objects.create_user("user", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.post = Post.objects.create(
+            user_id=1, title="Quick fox", body="Jumps over the dog"
+        )
+        self.other_post = Post.objects.create(
+            user_id=1, title="Lazy dog", body="Sleeps"
+        )
+        self.comment = Comment.objects.create(
+            post=self.post, name="Fox fan", email="fan@example.com",
+            body="Nice"
+        )
+        self.other_comment = Comment.objects.create(
+            post=self.post, name="N", email="n@example.com", body="Boring"
+        )
+
+    def search(self, url: str, text: str) -> list[int]:
+        response = self.client.get(url, {"search": text})
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.json()["results"]]
+
+    def test_posts(self):
+        url = "/news/posts/"
+        self.assertEqual(self.search(url, "fox"), [self.post.id])
+        self.assertEqual(
+            self.search(url, "dog"), [self.other_post.id, self.post.id]
+        )
+        self.assertEqual(self.search(url, "cat"), [])
+
+    def test_comments_of_post(self):
+        url = f"/news/posts/{self.post.id}/comments/"
+        self.assertEqual(self.search(url, "fox"), [self.comment.id])
+        self.assertEqual(
+            self.search(url, "fan@example.com"), [self.comment.id]
+        )
+        self.assertEqual(self.search(url, "boring"), [self.other_comment.id])
+        self.assertEqual(self.search(url, "cat"), [])
+
+    def test_blank_search_isnt_applied(self):
+        self.assertEqual(
+            self.search("/news/posts/", "  "),
+            [self.other_post.id, self.post.id]
+        )
+        self.assertEqual(
+            self.search(f"/news/posts/{self.post.id}/comments/", ""),
+            [self.other_comment.id, self.comment.id]
+        )
+
+class FilterTests(TestCase):
+    def setUp(self):
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+        user = User.objects.create_user("user", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.first = Post.objects.create(user_id=1, title="T", body="B")
+        self.second = Post.objects.create(user_id=2, title="T", body="B")
+        self.third = Post.objects.create(user_id=1, title="T", body="B")
+        self.comment = Comment.objects.create(
+            post=self.first, name="N", email="a@b.cd", body="C"
+        )
+        self.other_comment = Comment.objects.create(
+            post=self.second, name="N", email="x@y.zz", body="C"
+        )
+
+        day = datetime.fromisoformat("2026-01-01T00:00:00+00:00")
+        for number, post in enumerate([self.first, self.second, self.third]):
+            Post.objects.filter(pk=post.pk).update(
+                updated_at=day + timedelta(days=number)
+            )
+        Comment.objects.filter(pk=self.comment.pk).update(updated_at=day)
+        Comment.objects.filter(pk=self.other_comment.pk).update(
+            updated_at=day + timedelta(days=1)
+        )
+
+    def filter(self, url: str, **params) -> list[int]:
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item["id"] for item in response.json()["results"]]
+
+    def test_posts_by_user_id(self):
+        self.assertEqual(
+            self.filter("/news/posts/", user_id=1),
+            [self.third.id, self.first.id]
+        )
+
+    def test_posts_by_id_range(self):
+        self.assertEqual(
+            self.filter("/news/posts/", id_min=self.second.id),
+            [self.third.id, self.second.id]
+        )
+        self.assertEqual(
+            self.filter("/news/posts/", id_max=self.second.id),
+            [self.second.id, self.first.id]
+        )
+        self.assertEqual(
+            self.filter(
+                "/news/posts/", id_min=self.second.id, id_max=self.second.id
+            ),
+            [self.second.id]
+        )
+
+    def test_comments_by_post_and_email(self):
+        self.assertEqual(
+            self.filter("/news/comments/", post=self.first.id),
+            [self.comment.id]
+        )
+        self.assertEqual(
+            self.filter("/news/comments/", email="x@y.zz"),
+            [self.other_comment.id]
+        )
+        self.assertEqual(
+            self.filter(
+                f"/news/posts/{self.first.id}/comments/", email="x@y.zz"
+            ),
+            []
+        )
+
+    def test_updated_since(self):
+        # Naive timestamps are in UTC.
+        self.assertEqual(
+            self.filter("/news/posts/", updated_since="2026-01-02T00:00:00"),
+            [self.third.id, self.second.id]
+        )
+        self.assertEqual(
+            self.filter(
+                "/news/posts/", updated_since="2026-01-02T02:00:00+03:00"
+            ),
+            [self.third.id, self.second.id]
+        )
+        self.assertEqual(
+            self.filter(
+                "/news/posts/", updated_since="2026-01-01T23:00:00-03:00"
+            ),
+            [self.third.id]
+        )
+        self.assertEqual(
+            self.filter("/news/comments/", updated_since="2026-01-02"),
+            [self.other_comment.id]
+        )
+        self.assertEqual(
+            self.filter(
+                f"/news/posts/{self.first.id}/comments/",
+                updated_since="2026-01-02T00:00:00Z"
+            ),
+            []
+        )
+
+    def test_invalid_values(self):
+        for url, params in (
+                ("/news/posts/", {"user_id": "one"}),
+                ("/news/posts/", {"user_id": "99999999999999999999999"}),
+                ("/news/posts/", {"id_min": "-99999999999999999999999"}),
+                ("/news/posts/", {"id_max": "1.5"}),
+                ("/news/comments/", {"post": "99999999999999999999999"}),
+                ("/news/comments/", {"updated_since": "yesterday"}),
+                (
+                    f"/news/posts/{self.first.id}/comments/",
+                    {"updated_since": "2026-13-01"}
+                ),
+            ):
+            with self.subTest(url=url, params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                param, = params
+                self.assertEqual(
+                    response.json(),
+                    {param: [f"Invalid value: '{params[param]}'."]}
+                )
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+        user = User.objects.create_user("user", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def settle(self):
+        ModelEvent.objects.update(
+            logged_at=timezone.now() - timedelta(minutes=1)
+        )
+
+    def get_changes(self, **params) -> tuple[list, str]:
+        response = self.client.get("/news/changes/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        changes = [
+            (change["entity_pk"], change["type"]) for change in data["changes"]
+        ]
+        return changes, data["cursor"]
+
+    def test_young_events_are_held_back(self):
+        young = Post.objects.create(user_id=1, title="T", body="B")
+        old = Post.objects.create(user_id=1, title="T", body="B")
+        ModelEvent.objects.filter(entity_pk=old.id).update(
+            logged_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        # Older event with a bigger id isn't returned before the young one.
+        response = self.client.get("/news/changes/")
+        self.assertEqual(response.json()["changes"], [])
+
+        ModelEvent.objects.filter(entity_pk=young.id).update(
+            logged_at=timezone.now() - timedelta(minutes=1)
+        )
+        response = self.client.get("/news/changes/")
+        changes = response.json()["changes"]
+        self.assertEqual(
+            [change["entity_pk"] for change in changes], [young.id, old.id]
+        )
+
+
+    def test_cursor_is_followed_across_pages(self):
+        posts = [
+            Post.objects.create(user_id=1, title="T", body="B")
+            for _ in range(3)
+        ]
+        self.settle()
+        created = ModelEvent.EventType.CREATED
+
+        changes, cursor = self.get_changes(limit=2)
+        self.assertEqual(
+            changes, [(posts[0].id, created), (posts[1].id, created)]
+        )
+        changes, cursor = self.get_changes(cursor=cursor, limit=2)
+        self.assertEqual(changes, [(posts[2].id, created)])
+        changes, next_cursor = self.get_changes(cursor=cursor)
+        self.assertEqual(changes, [])
+        self.assertEqual(next_cursor, cursor)
+
+    def test_changes_are_compacted_within_page(self):
+        gone = Post.objects.create(user_id=1, title="T", body="B")
+        gone.delete()
+        post = Post.objects.create(user_id=1, title="T", body="B")
+        self.settle()
+        changes, cursor = self.get_changes()
+        # Created and deleted within the page, nothing to report.
+        self.assertEqual(changes, [(post.id, ModelEvent.EventType.CREATED)])
+
+        post_id = post.id
+        post.title = "T2"
+        post.save()
+        post.delete()
+        self.settle()
+        changes, cursor = self.get_changes(cursor=cursor)
+        self.assertEqual(changes, [(post_id, ModelEvent.EventType.DELETED)])
+
+    def test_limit_is_clamped(self):
+        for _ in range(3):
+            Post.objects.create(user_id=1, title="T", body="B")
+        self.settle()
+
+        changes, _ = self.get_changes(limit=0)
+        self.assertEqual(len(changes), 1)
+        with mock.patch.object(ChangeFeedView, "max_limit", 2):
+            changes, _ = self.get_changes(limit=5000)
+        self.assertEqual(len(changes), 2)
+
+    def test_wait_returns_once_events_settle(self):
+        post = Post.objects.create(user_id=1, title="T", body="B")
+        self.enterContext(
+            mock.patch.object(ChangeFeedView, "poll_interval", 0.01)
+        )
+        self.enterContext(mock.patch.object(
+            ChangeFeedView, "safety_lag", timedelta(milliseconds=200)
+        ))
+
+        start = time.monotonic()
+        changes, _ = self.get_changes(wait=10)
+
+        self.assertEqual(changes, [(post.id, ModelEvent.EventType.CREATED)])
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_invalid_params(self):
+        huge_cursor = base64.urlsafe_b64encode(b"9" * 26).decode()
+        for params in (
+                {"cursor": "!!!"},
+                {"cursor": huge_cursor},
+                {"limit": "many"},
+            ):
+            with self.subTest(params=params):
+                response = self.client.get("/news/changes/", params)
+                self.assertEqual(response.status_code, 400)
+
+class TrackedModelSaveTests(TestCase):
+    def setUp(self):
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+        self.post = Post.objects.create(user_id=1, title="T", body="B")
+        self.post = Post.objects.get(pk=self.post.pk)
+
+    def assertStored(self, **values):
+        stored = Post.objects.filter(pk=self.post.pk).values(*values).get()
+        self.assertEqual(stored, values)
+
+    def test_unchanged_object_isnt_saved(self):
+        events_count = ModelEvent.objects.count()
+        updated_at = self.post.updated_at
+
+        with self.assertNumQueries(0):
+            self.post.save()
+
+        self.assertEqual(ModelEvent.objects.count(), events_count)
+        self.assertStored(updated_at=updated_at)
+
+    def test_only_changed_fields_are_saved(self):
+        self.post.title = "T2"
+        Post.objects.filter(pk=self.post.pk).update(body="other")
+
+        self.post.save()
+
+        self.assertStored(title="T2", body="other")
+        self.assertEqual(
+            ModelEvent.objects.filter(type=ModelEvent.EventType.UPDATED)
+            .count(),
+            1
+        )
+
+    def test_fields_left_out_of_update_fields_are_saved_later(self):
+        self.post.title = "T2"
+        self.post.body = "B2"
+        self.post.save(update_fields=["title"])
+        self.post.save()
+
+        self.assertStored(title="T2", body="B2")
+
+    def test_refresh_resets_loaded_values(self):
+        Post.objects.filter(pk=self.post.pk).update(title="other")
+        self.post.refresh_from_db()
+        self.post.title = "T"
+
+        self.post.save()
+
+        self.assertStored(title="T")
+
+    def test_refresh_of_some_fields_resets_their_loaded_values(self):
+        Post.objects.filter(pk=self.post.pk).update(title="other")
+        self.post.refresh_from_db(fields=["title"])
+        self.post.title = "T"
+
+        self.post.save()
+
+        self.assertStored(title="T")
+
+    def test_save_with_matching_etag(self):
+        self.post.expect_etag(self.post.etag)
+        self.post.title = "T2"
+
+        self.post.save()
+
+        self.assertStored(title="T2")
+
+    def test_save_with_stale_etag(self):
+        with self.assertRaises(StaleObjectError):
+            self.post.expect_etag('"1"')
+
+    def test_save_of_object_modified_meanwhile(self):
+        self.post.expect_etag(self.post.etag)
+        Post.objects.filter(pk=self.post.pk).update(
+            title="other", updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        self.post.title = "T2"
+
+        with self.assertRaises(StaleObjectError), transaction.atomic():
+            self.post.save()
+
+        self.assertStored(title="other")
+
+
+class ConditionalUpdateTests(TestCase):
+    def setUp(self):
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+        user = User.objects.create_user("user", password="password")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.post = Post.objects.create(user_id=1, title="T", body="B")
+        self.url = f"/news/posts/{self.post.pk}/"
+
+    def test_update_with_current_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.put(
+            self.url, {"title": "T2", "body": "B"}, HTTP_IF_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_update_with_stale_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.put(self.url, {"title": "T2", "body": "B"})
+
+        response = self.client.put(
+            self.url, {"title": "T3", "body": "B"}, HTTP_IF_MATCH=etag
+        )
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 412)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, "T2")
@@ -20,5 +20,6 @@ urlpatterns = [
         "posts/<int:post_id>/comments/",
         comments_in_post,
         name="comments-in-post"
-    )
+    ),
+    path("changes/", views.ChangeFeedView.as_view(), name="changes"),
 ]
@@ -1,21 +1,77 @@
+import base64
+import binascii
+import time
+from datetime import timedelta
+
 from django.shortcuts import get_object_or_404
-from rest_framework import permissions, viewsets
+from django.utils import timezone
+from rest_framework import permissions, status, viewsets
+from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.mixins import (
     CreateModelMixin, DestroyModelMixin, ListModelMixin, RetrieveModelMixin,
     UpdateModelMixin
 )
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .filters import (
+    FullTextSearchFilter, QueryParamsFilter, parse_int, parse_timestamp
+)
+from .models import (
+    Comment, ModelEvent, Post, StaleObjectError, compact_events
+)
+from .serializers import (
+    CommentSerializer, ModelEventSerializer, PostSerializer
+)
+
 
-from .models import Comment, Post
-from .serializers import CommentSerializer, PostSerializer
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "Object was modified since you've read it."
+    default_code = "precondition_failed"
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class ConditionalUpdateMixin:
+    """
+    Adds `ETag` header to single object responses and supports `If-Match`
+    header on updates to avoid overwriting changes made by someone else.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data, headers={"ETag": instance.etag})
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response["ETag"] = self.etag
+        return response
+
+    def perform_update(self, serializer):
+        if_match = self.request.headers.get("If-Match", "*").strip()
+        try:
+            if if_match != "*":
+                serializer.instance.expect_etag(if_match)
+            serializer.save()
+        except StaleObjectError:
+            raise PreconditionFailed()
+        self.etag = serializer.instance.etag
+
+
+class PostViewSet(ConditionalUpdateMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows Posts to be viewed or edited.
     """
-    queryset = Post.objects.all().order_by("-id")
+    queryset = Post.objects.defer("search_vector").order_by("-id")
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = PostSerializer
+    filter_backends = [QueryParamsFilter, FullTextSearchFilter]
+    filter_params = {
+        "user_id": ("user_id", parse_int),
+        "id_min": ("id__gte", parse_int),
+        "id_max": ("id__lte", parse_int),
+        "updated_since": ("updated_at__gte", parse_timestamp),
+    }
     
     def perform_create(self, serializer):
         # predefined user_id value that we agreed to use
@@ -24,7 +80,9 @@ class PostViewSet(viewsets.ModelViewSet):
 
 
 class CommentViewSet(
+        ConditionalUpdateMixin,
         viewsets.GenericViewSet,
+        ListModelMixin,
         RetrieveModelMixin,
         UpdateModelMixin,
         DestroyModelMixin
@@ -32,9 +90,15 @@ class CommentViewSet(
     """
     API endpoint that allows Comments to be viewed or edited.
     """
-    queryset = Comment.objects.all().order_by("-id")
+    queryset = Comment.objects.defer("search_vector").order_by("-id")
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CommentSerializer
+    filter_backends = [QueryParamsFilter]
+    filter_params = {
+        "post": ("post_id", parse_int),
+        "email": ("email", str),
+        "updated_since": ("updated_at__gte", parse_timestamp),
+    }
 
 
 class CommentsInPostViewSet(
@@ -47,14 +111,102 @@ class CommentsInPostViewSet(
     """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CommentSerializer
+    filter_backends = [QueryParamsFilter, FullTextSearchFilter]
+    filter_params = {
+        "email": ("email", str),
+        "updated_since": ("updated_at__gte", parse_timestamp),
+    }
 
     def get_queryset(self):
         post_id = self.kwargs.get("post_id")
         get_object_or_404(Post, pk=post_id)  # return 404 if Post not found
-        return Comment.objects.filter(post_id=post_id).order_by("-id")
+        return (
+            Comment.objects.filter(post_id=post_id)
+            .defer("search_vector")
+            .order_by("-id")
+        )
     
     def perform_create(self, serializer):
         post_id = self.kwargs.get("post_id")
         get_object_or_404(Post, pk=post_id)  # return 404 if Post not found
         serializer.save(post_id=post_id)
         return super().perform_create(serializer)
+
+
+def encode_cursor(event_id: int) -> str:
+    return base64.urlsafe_b64encode(str(event_id).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return parse_int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError({"cursor": ["Invalid cursor."]})
+
+
+class ChangeFeedView(APIView):
+    """
+    API endpoint that returns changes of Posts and Comments since `cursor`.
+
+    Changes of the same object within one page are merged, the same way as
+    for the periodical sync. Returned `cursor` should be passed to the next
+    request. With `wait` (seconds) the request is held until new changes
+    appear or the time is up (long polling).
+
+    Events younger than `safety_lag` aren't returned: event ids are taken
+    before the transaction commits, so an event with a smaller id could still
+    become visible after the one with a bigger id had been returned.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 100
+    max_limit = 1000
+    max_wait = 30
+    poll_interval = 1.0
+    safety_lag = timedelta(seconds=5)
+
+    def _get_settled_events(self, last_id: int, limit: int) -> list:
+        """Returns events after `last_id`, up to the first too young one."""
+        cutoff = timezone.now() - self.safety_lag
+        events = []
+        for event in (
+                ModelEvent.objects.filter(id__gt=last_id)
+                .order_by("id")[:limit]):
+            if event.logged_at >= cutoff:
+                break
+            events.append(event)
+        return events
+
+    def _get_int_param(
+            self, name: str, default: int, minimum: int, maximum: int
+        ) -> int:
+        value = self.request.query_params.get(name)
+        if not value:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValidationError({name: [f"Invalid value: '{value}'."]})
+        return min(max(value, minimum), maximum)
+
+    def get(self, request):
+        cursor = request.query_params.get("cursor")
+        last_id = decode_cursor(cursor) if cursor else 0
+        limit = self._get_int_param(
+            "limit", self.default_limit, 1, self.max_limit
+        )
+        wait = self._get_int_param("wait", 0, 0, self.max_wait)
+
+        deadline = time.monotonic() + wait
+        while True:
+            events = self._get_settled_events(last_id, limit)
+            if events or time.monotonic() >= deadline:
+                break
+            time.sleep(self.poll_interval)
+
+        if events:
+            last_id = events[-1].id
+        changes = ModelEventSerializer(compact_events(events), many=True)
+        return Response({
+            "cursor": encode_cursor(last_id),
+            "changes": changes.data,
+        })
@@ -147,3 +147,12 @@ SIMPLE_JWT = {
     # Extending token lifetime just for Demo purposes
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=1),
 }
+
+# Target API which our data is being synchronized to.
+SYNC_TARGET_URL = os.environ.get(
+    "SYNC_TARGET_URL", "https://jsonplaceholder.typicode.com"
+)
+
+# Gzip request bodies sent to the Target API. Enable only if it supports
+# `Content-Encoding: gzip` requests (JSONPlaceholder doesn't).
+SYNC_TARGET_GZIP = os.environ.get("SYNC_TARGET_GZIP", "0") == "1"
@@ -0,0 +1,18 @@
+"""
+Slim Django settings for management commands which work only with news data.
+
+`manage.py` picks them up automatically for commands listed in its
+`SLIM_SETTINGS_COMMANDS`, these commands are run by cron frequently and
+don't need the web stack (admin, sessions, templates, DRF) to be loaded.
+Don't use these settings for `migrate` and the web server.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'news.apps.NewsConfig',
+]
+
+MIDDLEWARE = []
+
+TEMPLATES = []